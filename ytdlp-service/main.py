@@ -4,29 +4,123 @@ FastAPI service that wraps yt-dlp for video extraction
 Deploy on Railway, Render, or similar platforms that support Python
 """
 
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel, HttpUrl
-import subprocess
-import json
+import asyncio
+import atexit
 import os
+import queue
+import re
 import sys
+import time
 from typing import Optional
+from urllib.parse import parse_qs, urlsplit
 import logging
+from logging.handlers import QueueHandler, QueueListener
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+from concurrent.futures import ProcessPoolExecutor
+
+import orjson
+import yt_dlp
+from cachetools import TTLCache
+from yt_dlp import YoutubeDL
+
+# Configure logging. Records go through a queue to a background listener
+# thread, so the (potentially blocking) stderr write syscall never runs on
+# the event loop.
+log_queue = queue.SimpleQueue()
+stream_handler = logging.StreamHandler()
+stream_handler.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+log_listener = QueueListener(log_queue, stream_handler)
+log_listener.start()
+atexit.register(log_listener.stop)
+root_logger = logging.getLogger()
+root_logger.setLevel(logging.INFO)
+root_logger.addHandler(QueueHandler(log_queue))
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="yt-dlp API Service", version="1.0.0")
+# orjson-backed responses for the endpoints that return plain dicts
+app = FastAPI(
+    title="yt-dlp API Service",
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+)
 
-# CORS configuration
-cors_origin = os.getenv("CORS_ORIGIN", "*")
+# Cache extracted metadata per video so repeat requests for hot URLs skip
+# yt-dlp (and YouTube bot detection) entirely. Entries are either the
+# serialized JSON payload, or an asyncio.Future while an extraction is in
+# flight so concurrent requests for the same video share one yt-dlp invocation.
+# The v= form is anchored to a query delimiter so params merely ending in
+# "v" can't match, and the id group is bounded so longer junk values don't
+# silently truncate to a wrong (and then cached) video id
+VIDEO_ID_RE = re.compile(
+    r"(?:[?&]v=|youtu\.be/|/shorts/|/embed/|/live/)([0-9A-Za-z_-]{11})(?![0-9A-Za-z_-])"
+)
+CACHE = TTLCache(maxsize=1024, ttl=900)
+CACHE_LOCK = asyncio.Lock()
+
+# YouTube hosts whose URLs we know how to canonicalize. This service also
+# fronts every other platform the app supports (TikTok, Instagram, Vimeo,
+# ...), so non-YouTube hosts pass through to yt-dlp untouched.
+YOUTUBE_HOSTS = {
+    "youtube.com",
+    "www.youtube.com",
+    "m.youtube.com",
+    "music.youtube.com",
+    "youtu.be",
+    "youtube-nocookie.com",
+    "www.youtube-nocookie.com",
+}
+
+def canonicalize_url(video_url):
+    """
+    Normalize recognized YouTube video URLs to a canonical youtube.com form
+    with tracking params stripped; other hosts are returned unchanged so
+    yt-dlp can handle every platform it supports
+    Returns (url, video_id), where video_id is the cache key and is only
+    set for YouTube video URLs - other hosts must stay uncached, since an
+    id-lookalike in some other site's URL is not the same video
+    Canonicalization also improves the cache hit rate, since youtu.be links
+    and share links with tracking junk collapse onto the same URL
+    """
+    parts = urlsplit(video_url)
+    host = (parts.hostname or "").lower()
+    if host not in YOUTUBE_HOSTS:
+        return video_url, None
+
+    match = VIDEO_ID_RE.search(video_url)
+    if not match:
+        # No recognizable video id; let yt-dlp decide what to do with it
+        return video_url, None
+    video_id = match.group(1)
+
+    # Keep Shorts URLs in Shorts form so the extractor sees them as such
+    if "/shorts/" in parts.path:
+        return f"https://www.youtube.com/shorts/{video_id}", video_id
+
+    # Everything else collapses to watch?v=, keeping only the start time
+    canonical = f"https://www.youtube.com/watch?v={video_id}"
+    start_time = parse_qs(parts.query).get("t")
+    if start_time:
+        canonical += f"&t={start_time[0]}"
+    return canonical, video_id
+
+# CORS configuration: CORS_ORIGIN is a comma-separated allow-list, parsed
+# once at startup. A wildcard combined with allow_credentials=True is
+# invalid per the CORS spec (browsers drop the header), so credentials are
+# only enabled when explicit origins are configured.
+cors_origins = frozenset(
+    origin.strip()
+    for origin in os.getenv("CORS_ORIGIN", "*").split(",")
+    if origin.strip()
+)
+cors_allow_all = "*" in cors_origins or not cors_origins
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=[cors_origin] if cors_origin != "*" else ["*"],
-    allow_credentials=True,
+    allow_origins=["*"] if cors_allow_all else sorted(cors_origins),
+    allow_credentials=not cors_allow_all,
     allow_methods=["*"],
     allow_headers=["*"],
 )
@@ -40,156 +134,332 @@ class HealthResponse(BaseModel):
     ytdlp_available: bool
     python_version: str
 
+# yt_dlp is imported in-process, so its availability and version are known
+# once at startup; platform probes hitting /health every few seconds used
+# to spawn a full interpreter for yt_dlp --version on every call
+YTDLP_VERSION = yt_dlp.version.__version__
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    try:
-        # Check if yt-dlp is available
-        result = subprocess.run(
-            [sys.executable, "-m", "yt_dlp", "--version"],
-            capture_output=True,
-            text=True,
-            timeout=5
-        )
-        ytdlp_available = result.returncode == 0
-        ytdlp_version = result.stdout.strip() if ytdlp_available else "Not available"
-    except Exception as e:
-        logger.warning(f"yt-dlp check failed: {e}")
-        ytdlp_available = False
-        ytdlp_version = "Not available"
-    
     return {
         "status": "ok",
-        "ytdlp_available": ytdlp_available,
-        "ytdlp_version": ytdlp_version,
+        "ytdlp_available": True,
+        "ytdlp_version": YTDLP_VERSION,
         "python_version": sys.version
     }
 
-@app.post("/extract")
-async def extract_video(request: ExtractRequest):
+# Static extractor tuning shared by every player client config, built once
+# These help with Shorts and bot detection
+YT_EXTRACTOR_ARGS = {
+    "player_params": ["8AEB"],
+    "include_live_chat": ["false"],
+    "skip": ["dash", "translated_subs"],
+}
+
+# Mimic browser behavior
+HTTP_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Referer": "https://www.youtube.com/",
+}
+
+def build_opts(client_type, skip_type):
+    """Build the yt-dlp options dict for one player client config"""
+    return {
+        "quiet": True,
+        "no_warnings": True,
+        "noplaylist": True,
+        "socket_timeout": 10,
+        # yt-dlp's report_error writes raw ERROR: lines to stderr even with
+        # quiet/no_warnings; give it a logger so its messages go through the
+        # logging pipeline like everything else
+        "logger": logging.getLogger("yt_dlp"),
+        # Metadata-only endpoint: turn off everything we never return so
+        # yt-dlp does less network and parsing work per video
+        "skip_download": True,
+        "check_formats": False,
+        "writesubtitles": False,
+        "writeautomaticsub": False,
+        "listsubtitles": False,
+        "writethumbnail": False,
+        "writeinfojson": False,
+        "writeannotations": False,
+        "youtube_include_dash_manifest": False,
+        "youtube_include_hls_manifest": False,
+        "extractor_args": {
+            "youtube": {
+                "player_client": [client_type],
+                "player_skip": [skip_type] if skip_type else [],
+                **YT_EXTRACTOR_ARGS,
+            }
+        },
+        "http_headers": HTTP_HEADERS,
+    }
+
+# YouTube player clients to try
+# Different client types help avoid bot detection
+PLAYER_CONFIGS = [
+    ("web", "webpage"),  # Web client with webpage skip
+    ("web", None),       # Web client without skip (for Shorts)
+    ("ios", None),       # iOS client
+    ("android", None),   # Android client
+    ("mweb", None),      # Mobile web client
+]
+
+# The options for a given config are identical across requests, so build
+# them once at import instead of on every /extract call
+CONFIG_OPTS = [
+    (
+        f"{client_type}" + (f" (skip: {skip_type})" if skip_type else ""),
+        build_opts(client_type, skip_type),
+    )
+    for client_type, skip_type in PLAYER_CONFIGS
+]
+
+# When YouTube's bot wall is up, every client type tends to fail the same
+# way, so retrying all five per request just burns time. After a
+# bot-detection error we remember it briefly and probe with a single client
+# until the wall expires or an extraction succeeds.
+BOT_WALL_TTL = 120  # seconds
+BOT_WALL_UNTIL = 0.0
+
+# Cheap title peek on the serialized payload, for success logging only
+TITLE_RE = re.compile(rb'"title":\s*"([^"]{1,200})"')
+
+def _pool_worker_init():
     """
-    Extract video information using yt-dlp
-    Returns JSON in the same format as yt-dlp --dump-json
-    Tries multiple player clients to avoid YouTube bot detection
+    Reconfigure logging inside a pool process
+    Forked workers inherit the parent's QueueHandler but not the listener
+    thread that drains the queue, so anything they log (e.g. yt-dlp errors)
+    would pile up unseen; give them a plain stderr handler instead
     """
-    video_url = str(request.url)
-    logger.info(f"Extracting video: {video_url}")
-    
-    # Try different YouTube player clients and configurations
-    # This helps avoid bot detection by using different client types
-    # Each tuple: (client_type, skip_type, additional_args)
-    player_configs = [
-        ("web", "webpage", []),  # Web client with webpage skip
-        ("web", None, []),       # Web client without skip (for Shorts)
-        ("ios", None, []),       # iOS client
-        ("android", None, []),   # Android client
-        ("mweb", None, []),      # Mobile web client
-    ]
-    
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+    logging.getLogger().handlers = [handler]
+
+# Pool of long-lived worker processes shared by all requests. Extraction
+# includes real CPU work (signature decryption, nsig JS interpretation,
+# regex-heavy parsing) that threads cannot parallelize under the GIL;
+# pool workers import yt-dlp once and run many extractions each.
+EXECUTOR = ProcessPoolExecutor(max_workers=os.cpu_count(), initializer=_pool_worker_init)
+
+@app.on_event("shutdown")
+async def stop_executor():
+    EXECUTOR.shutdown(wait=False, cancel_futures=True)
+
+# Backpressure: cap how many extraction fan-outs run at once so a request
+# burst queues instead of saturating the pool, and shed load outright once
+# the queue gets deep enough that waiters would time out anyway
+MAX_CONCURRENCY = int(os.getenv("YTDLP_MAX_CONCURRENCY", str((os.cpu_count() or 1) * 2)))
+EXTRACT_SEM = asyncio.Semaphore(MAX_CONCURRENCY)
+MAX_WAITING = MAX_CONCURRENCY * 4
+extract_waiting = 0
+
+# Errors that no player client can work around; seeing one of these means
+# the remaining attempts would fail the same way
+FATAL_SUBSTRINGS = (
+    "Video unavailable",
+    "Private video",
+    "has been removed",
+    "members-only",
+    "This live event will begin",
+    "Join this channel",
+    "not available in your country",
+)
+
+class ExtractionError(Exception):
+    """Raised when a single player-client attempt fails; str(exc) carries the error message"""
+
+class FatalExtractionError(ExtractionError):
+    """Raised when the video cannot be extracted by any client (removed, private, gated)"""
+
+# One YoutubeDL instance per (config, cookiefile) in each pool process.
+# Reusing the instance keeps its internal HTTP opener alive, so TCP+TLS
+# handshakes to YouTube are amortized across extractions instead of being
+# paid again for every attempt.
+_YDL_CACHE = {}
+
+def _get_ydl(config_index, cookies_file):
+    """Return the pool process's persistent YoutubeDL for one config"""
+    key = (config_index, cookies_file)
+    ydl = _YDL_CACHE.get(key)
+    if ydl is None:
+        opts = CONFIG_OPTS[config_index][1]
+        if cookies_file:
+            opts = {**opts, "cookiefile": cookies_file}
+        ydl = YoutubeDL(opts)
+        _YDL_CACHE[key] = ydl
+    return ydl
+
+def _extract_worker(config_index, cookies_file, video_url):
+    """
+    Run one yt-dlp extraction and serialize the sanitized info to JSON bytes
+    Runs inside a pool process; serializing here keeps the data crossing the
+    process boundary compact and lets the response path pass bytes through
+    """
+    try:
+        info = _get_ydl(config_index, cookies_file).extract_info(video_url, download=False)
+    except yt_dlp.utils.DownloadError as e:
+        # Flatten to a plain, picklable error carrying the yt-dlp message
+        raise ExtractionError(e.msg or str(e)) from None
+    if info is None:
+        raise ExtractionError("yt-dlp returned no data")
+    return orjson.dumps(YoutubeDL.sanitize_info(info))
+
+async def try_client(config_name, config_index, video_url, cookies_file):
+    """
+    Run one yt-dlp attempt for a single player client config on a pool worker
+    Returns the serialized JSON payload on success, raises ExtractionError on failure
+    """
+    global BOT_WALL_UNTIL
+
+    logger.info("Trying YouTube client: %s", config_name)
+
+    # Bound each attempt at 60 seconds like the old subprocess timeout did.
+    # The pool job itself cannot be killed and finishes in the background,
+    # but the request unblocks and releases its semaphore slot.
+    try:
+        payload = await asyncio.wait_for(
+            asyncio.get_running_loop().run_in_executor(
+                EXECUTOR, _extract_worker, config_index, cookies_file, video_url
+            ),
+            timeout=60,
+        )
+    except asyncio.TimeoutError:
+        logger.warning("Client %s timed out", config_name)
+        raise ExtractionError("Video extraction timed out")
+    except ExtractionError as e:
+        error_msg = str(e)
+        if logger.isEnabledFor(logging.WARNING):
+            logger.warning("Client %s failed: %s", config_name, error_msg[:200])
+
+        # Errors no other client can recover from: stop the whole fan-out
+        if any(s in error_msg for s in FATAL_SUBSTRINGS):
+            raise FatalExtractionError(error_msg[:500])
+
+        # Check if it's a bot detection error
+        if "Sign in to confirm" in error_msg or "not a bot" in error_msg:
+            BOT_WALL_UNTIL = time.monotonic() + BOT_WALL_TTL
+            raise ExtractionError(f"YouTube bot detection (tried {config_name})")
+        elif "not available on this app" in error_msg or "Watch on the latest version" in error_msg:
+            # This client doesn't support this content type (e.g., Shorts on android)
+            raise ExtractionError(f"Content not available for {config_name}: {error_msg[:200]}")
+        else:
+            # Other error, might work with different client
+            raise ExtractionError(error_msg[:500])
+    except Exception as e:
+        logger.warning("Client %s error: %s", config_name, e)
+        raise ExtractionError(str(e))
+
+    # Success clears the bot wall
+    BOT_WALL_UNTIL = 0.0
+
+    if logger.isEnabledFor(logging.INFO):
+        match = TITLE_RE.search(payload)
+        title = match.group(1).decode(errors="replace") if match else "Unknown"
+        logger.info("Successfully extracted video: %s (client: %s)", title, config_name)
+    return payload
+
+async def run_extraction(video_url):
+    """
+    Race all player client configs for one video
+    Returns the serialized JSON payload, raises HTTPException if every client fails
+    """
+    global extract_waiting
+
+    # Shed load fast instead of queueing requests that would only time out
+    if EXTRACT_SEM.locked() and extract_waiting >= MAX_WAITING:
+        raise HTTPException(
+            status_code=503,
+            detail="Extraction queue is full, try again shortly"
+        )
+
+    extract_waiting += 1
+    try:
+        await EXTRACT_SEM.acquire()
+    finally:
+        extract_waiting -= 1
+
+    try:
+        return await run_extraction_inner(video_url)
+    finally:
+        EXTRACT_SEM.release()
+
+async def run_extraction_inner(video_url):
+    """The extraction fan-out itself; callers go through run_extraction"""
     # Optional: Use cookies if provided via environment variable
     cookies_file = os.getenv("YTDLP_COOKIES_FILE")
     use_cookies = cookies_file and os.path.exists(cookies_file)
     if use_cookies:
         logger.info("Using cookies file for authentication")
-    
+
     last_error = None
-    
-    for client_type, skip_type, additional_args in player_configs:
-        # Build config name for logging
-        config_name = f"{client_type}" + (f" (skip: {skip_type})" if skip_type else "")
-        
-        try:
-            # Build base args
-            args = [
-                sys.executable,
-                "-m",
-                "yt_dlp",
-                "--dump-json",
-                "--no-warnings",
-                "--no-playlist",
-                "--user-agent", "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-                "--extractor-args", f"youtube:player_client={client_type}",
-            ]
-            
-            # Add skip type if specified
-            if skip_type:
-                args.extend(["--extractor-args", f"youtube:player_skip={skip_type}"])
-            
-            # Add additional extractor args for better compatibility
-            # These help with Shorts and bot detection
-            args.extend([
-                "--extractor-args", "youtube:player_params=8AEB",
-                "--extractor-args", "youtube:include_live_chat=false",
-                "--extractor-args", "youtube:skip=dash,translated_subs",
-            ])
-            
-            # Add referer header to mimic browser behavior
-            args.extend([
-                "--add-header", "Referer:https://www.youtube.com/",
-            ])
-            
-            # Add any additional args for this config
-            args.extend(additional_args)
-            
-            # Add cookies if available
-            if use_cookies:
-                args.extend(["--cookies", cookies_file])
-            
-            # Add video URL
-            args.append(video_url)
-            
-            logger.info(f"Trying YouTube client: {config_name}")
-            
-            # Run yt-dlp with timeout (60 seconds)
-            result = subprocess.run(
-                args,
-                capture_output=True,
-                text=True,
-                timeout=60,
-                check=False  # Don't raise on non-zero exit
+    payload = None
+    fatal = False
+
+    # While the bot wall is believed to be up, probe with just the first
+    # client instead of burning five attempts that will all be blocked
+    configs = CONFIG_OPTS
+    if time.monotonic() < BOT_WALL_UNTIL:
+        logger.info("Bot wall recently seen, probing with a single client")
+        configs = CONFIG_OPTS[:1]
+
+    # Launch all client attempts in parallel and take the first success,
+    # cutting worst-case latency from the sum of all timeouts to the max
+    tasks = [
+        asyncio.create_task(
+            try_client(
+                config_name,
+                config_index,
+                video_url,
+                cookies_file if use_cookies else None,
             )
-            
-            if result.returncode == 0:
-                # Success! Parse and return
-                try:
-                    data = json.loads(result.stdout)
-                    logger.info(f"Successfully extracted video: {data.get('title', 'Unknown')} (client: {config_name})")
-                    return JSONResponse(content=data)
-                except json.JSONDecodeError as e:
-                    logger.error(f"Failed to parse yt-dlp JSON: {e}")
-                    logger.error(f"Output: {result.stdout[:500]}")
-                    last_error = f"Failed to parse yt-dlp output: {str(e)}"
-                    continue  # Try next client
-            
-            # If we get here, this client failed
-            error_msg = result.stderr or result.stdout or "Unknown error"
-            logger.warning(f"Client {config_name} failed: {error_msg[:200]}")
-            
-            # Check if it's a bot detection error
-            if "Sign in to confirm" in error_msg or "not a bot" in error_msg:
-                last_error = f"YouTube bot detection (tried {config_name})"
-                continue  # Try next client
-            elif "not available on this app" in error_msg or "Watch on the latest version" in error_msg:
-                # This client doesn't support this content type (e.g., Shorts on android)
-                last_error = f"Content not available for {config_name}: {error_msg[:200]}"
-                continue  # Try next client
-            else:
-                # Other error, might work with different client
-                last_error = error_msg[:500]
-                continue
-            
-        except subprocess.TimeoutExpired:
-            logger.warning(f"Client {config_name} timed out")
-            last_error = "Video extraction timed out"
-            continue
-        except Exception as e:
-            logger.warning(f"Client {config_name} error: {e}")
-            last_error = str(e)
-            continue
-    
+        )
+        for config_index, (config_name, _) in enumerate(configs)
+    ]
+
+    try:
+        for fut in asyncio.as_completed(tasks):
+            try:
+                payload = await fut
+                break  # First success wins
+            except FatalExtractionError as e:
+                # Removed/private/gated video: no client will do better
+                last_error = str(e)
+                fatal = True
+                break
+            except ExtractionError as e:
+                last_error = str(e)
+            except Exception as e:
+                last_error = str(e)
+    finally:
+        # Cancel the losers; an attempt already running in the pool finishes
+        # in the background and its result is discarded
+        pending = [t for t in tasks if not t.done()]
+        for t in pending:
+            t.cancel()
+        if pending:
+            await asyncio.wait(pending, return_when=asyncio.ALL_COMPLETED)
+        # Drain exceptions from tasks that finished before we broke out of
+        # the loop, so asyncio doesn't log them as never-retrieved at GC
+        for t in tasks:
+            if t.done() and not t.cancelled():
+                t.exception()
+
+    if payload is not None:
+        return payload
+
+    if fatal:
+        # 404 so clients can tell a dead video apart from extractor trouble
+        logger.error("Extraction failed permanently: %s", last_error)
+        raise HTTPException(
+            status_code=404,
+            detail=f"yt-dlp extraction failed: {last_error}"
+        )
+
     # All clients failed
     error_detail = last_error or "All YouTube client types failed"
-    logger.error(f"All extraction attempts failed: {error_detail}")
+    logger.error("All extraction attempts failed: %s", error_detail)
     
     # Provide helpful error message
     if "bot" in error_detail.lower() or "Sign in" in error_detail:
@@ -210,6 +480,75 @@ async def extract_video(request: ExtractRequest):
         detail=f"yt-dlp extraction failed: {error_detail}"
     )
 
+def payload_response(payload, fields=None):
+    """
+    Build the JSON response for a serialized payload
+    When fields is given (comma-separated top-level keys), the payload is
+    stripped down so callers that only need e.g. title/duration/thumbnail
+    don't pull hundreds of KB of format data
+    """
+    if fields:
+        wanted = [f for f in (f.strip() for f in fields.split(",")) if f]
+        if wanted:
+            data = orjson.loads(payload)
+            payload = orjson.dumps({k: data[k] for k in wanted if k in data})
+    return Response(content=payload, media_type="application/json")
+
+@app.post("/extract")
+async def extract_video(request: ExtractRequest, fields: Optional[str] = None):
+    """
+    Extract video information using yt-dlp
+    Returns JSON in the same format as yt-dlp --dump-json
+    Races multiple player clients in parallel to avoid YouTube bot detection
+    Results are cached per video id, and concurrent requests for the same
+    video share a single extraction
+    The optional ?fields= query param limits the response to the given
+    comma-separated top-level keys
+    """
+    # The cache key is the 11-char video id, set only for YouTube URLs
+    video_url, video_id = canonicalize_url(str(request.url))
+    logger.info("Extracting video: %s", video_url)
+
+    if video_id is None:
+        # Not a recognizable YouTube video URL; extract without caching
+        return payload_response(await run_extraction(video_url), fields)
+
+    future = None
+    async with CACHE_LOCK:
+        cached = CACHE.get(video_id)
+        if cached is None:
+            # First request for this video: park a future so concurrent
+            # requests coalesce onto this extraction instead of spawning
+            # their own yt-dlp runs
+            future = asyncio.get_running_loop().create_future()
+            CACHE[video_id] = future
+
+    if cached is not None:
+        if isinstance(cached, asyncio.Future):
+            logger.info("Joining in-flight extraction for video %s", video_id)
+            return payload_response(await asyncio.shield(cached), fields)
+        logger.info("Cache hit for video %s", video_id)
+        return payload_response(cached, fields)
+
+    try:
+        payload = await run_extraction(video_url)
+    except BaseException as e:
+        # Drop the placeholder and propagate the failure to any waiters
+        async with CACHE_LOCK:
+            if CACHE.get(video_id) is future:
+                del CACHE[video_id]
+        if isinstance(e, Exception):
+            future.set_exception(e)
+            future.exception()  # mark retrieved in case nobody is waiting
+        else:
+            future.cancel()
+        raise
+
+    async with CACHE_LOCK:
+        CACHE[video_id] = payload
+    future.set_result(payload)
+    return payload_response(payload, fields)
+
 @app.get("/")
 async def root():
     """Root endpoint with service information"""
@@ -225,4 +564,14 @@ async def root():
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", 8000))
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    # uvloop and httptools (both shipped by uvicorn[standard]) cut the
+    # per-request event loop and HTTP parsing overhead well below the
+    # default asyncio stack
+    uvicorn.run(
+        app,
+        host="0.0.0.0",
+        port=port,
+        loop="uvloop",
+        http="httptools",
+        access_log=False,
+    )